@@ -1,10 +1,16 @@
 import argparse
 import os
+import random
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 
+import httpx
+import ijson
 import pandas as pd
-import requests
+import pyarrow as pa
+import pyarrow.csv as pacsv
 
 # Bearer token from your X/Twitter app
 # export X_BEARER_TOKEN="YOUR_TOKEN"
@@ -12,19 +18,87 @@ BEARER_TOKEN = os.getenv("X_BEARER_TOKEN")
 
 BASE_URL = "https://api.twitter.com/2/tweets/counts/recent"
 
+# Query-independent parameters; each call derives its own dict from this so
+# no mutable params state is shared between the fan-out threads.
+BASE_PARAMS = {"granularity": "day"}
+
+HEADERS = {"User-Agent": "proyectFemCountsPython"}
+if BEARER_TOKEN:
+    HEADERS["Authorization"] = f"Bearer {BEARER_TOKEN}"
+
+# Shared HTTP/2 client: beyond keep-alive, h2 multiplexes the concurrent
+# candidate queries as streams on a single TLS connection, so parallel calls
+# share one handshake instead of one socket each.
+CLIENT = httpx.Client(
+    http2=True,
+    headers=HEADERS,
+    timeout=httpx.Timeout(30.0, connect=5.0),
+    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+)
+
 # Two candidates for this project
 CANDIDATES = {
     "Jara": '("Jeannette Jara" OR "Jeannet Jara" OR jeannette_jara) lang:es -is:retweet',
     "Matthei": '("Evelyn Matthei" OR evelynmatthei) lang:es -is:retweet',
 }
 
-def bearer_oauth(r: requests.Request) -> requests.Request:
-    """Attach bearer token to the request."""
-    if not BEARER_TOKEN:
-        raise RuntimeError("Set X_BEARER_TOKEN environment variable with your bearer token.")
-    r.headers["Authorization"] = f"Bearer {BEARER_TOKEN}"
-    r.headers["User-Agent"] = "proyectFemCountsPython"
-    return r
+# AIMD client-side backpressure: concurrent calls are capped at _cap, which is
+# halved on a 429 (multiplicative decrease) and nudged back up by one on each
+# success (additive increase) until it reaches _MAX_CONCURRENCY again.
+_MAX_CONCURRENCY = 8
+_throttle = threading.Condition()
+_cap = _MAX_CONCURRENCY
+_in_flight = 0
+
+
+def call_api(params: dict) -> httpx.Response:
+    """GET ``BASE_URL`` with rate-limit-aware throttling.
+
+    Reads ``x-rate-limit-remaining``/``x-rate-limit-reset`` after each
+    response and proactively sleeps until the reset when the quota is nearly
+    exhausted; on a 429 or 5xx it retries with jittered backoff, halving the
+    concurrency cap for 429s, and raises RuntimeError once the attempts are
+    exhausted. The response is streamed; callers must close it.
+    """
+    global _cap, _in_flight
+
+    resp: httpx.Response | None = None
+    for attempt in range(5):
+        with _throttle:
+            while _in_flight >= _cap:
+                _throttle.wait()
+            _in_flight += 1
+        try:
+            resp = CLIENT.send(CLIENT.build_request("GET", BASE_URL, params=params), stream=True)
+        finally:
+            with _throttle:
+                _in_flight -= 1
+                _throttle.notify_all()
+
+        if resp.status_code == 429 or resp.status_code >= 500:
+            # Read before closing so resp.text stays available for the
+            # RuntimeError below if this turns out to be the last attempt.
+            resp.read()
+            resp.close()
+            if resp.status_code == 429:
+                with _throttle:
+                    _cap = max(1, _cap // 2)
+            pause = int(resp.headers.get("retry-after", 1))
+            time.sleep(pause + random.uniform(0, 0.5 * 2**attempt))
+            continue
+
+        with _throttle:
+            if _cap < _MAX_CONCURRENCY:
+                _cap += 1
+                _throttle.notify_all()
+
+        remaining = int(resp.headers.get("x-rate-limit-remaining", _MAX_CONCURRENCY))
+        reset = int(resp.headers.get("x-rate-limit-reset", 0))
+        if remaining <= 2:
+            time.sleep(max(0.0, reset - time.time()))
+        return resp
+
+    raise RuntimeError(f"Error {resp.status_code}: {resp.text}")
 
 
 def fetch_counts(query: str) -> list[dict]:
@@ -32,15 +106,32 @@ def fetch_counts(query: str) -> list[dict]:
 
     Returns a list of {start, end, tweet_count}.
     """
-    params = {
-        "query": query,
-        "granularity": "day",
-    }
-    resp = requests.get(BASE_URL, auth=bearer_oauth, params=params)
-    if resp.status_code != 200:
-        raise RuntimeError(f"Error {resp.status_code}: {resp.text}")
-    data = resp.json()
-    return data.get("data", [])
+    if not BEARER_TOKEN:
+        raise RuntimeError("Set X_BEARER_TOKEN environment variable with your bearer token.")
+    params = {**BASE_PARAMS, "query": query}
+    resp = call_api(params)
+    try:
+        if resp.status_code != 200:
+            resp.read()
+            raise RuntimeError(f"Error {resp.status_code}: {resp.text}")
+        # Parse the response incrementally straight off the wire: each daily
+        # bucket is yielded as its chunk arrives instead of buffering the
+        # whole body (ijson accepts an iterable of bytes).
+        return list(ijson.items(resp.iter_bytes(), "data.item"))
+    finally:
+        resp.close()
+
+
+def count_recent_tweets(query: str) -> int:
+    """Total tweet count for a query over the recent window, in one API call.
+
+    Uses /2/tweets/counts/recent rather than paginating /tweets/search/recent,
+    so a bare count costs a single request instead of one per 100 results
+    (and does not burn search quota). A like-count floor can be pushed into
+    the query itself with the ``min_faves:<n>`` operator where the API tier
+    supports it.
+    """
+    return sum(row["tweet_count"] for row in fetch_counts(query))
 
 
 def extract_conversation_ids(csv_path: str) -> list[str]:
@@ -52,20 +143,20 @@ def extract_conversation_ids(csv_path: str) -> list[str]:
     if not os.path.exists(csv_path):
         raise FileNotFoundError(f"CSV not found: {csv_path}")
 
-    df = pd.read_csv(csv_path)
+    try:
+        # Only one column is consumed, so skip parsing the rest of the file.
+        df = pd.read_csv(csv_path, usecols=["conversation_id"], dtype={"conversation_id": "string"})
+    except ValueError:
+        # Column not present: fall back to a full read so the error below
+        # stays a KeyError, as before.
+        df = pd.read_csv(csv_path)
 
     if "conversation_id" not in df.columns:
         raise KeyError("CSV must contain a 'conversation_id' column")
 
-    # Drop missing values, convert to string, and preserve order while de-duplicating.
-    seen: set[str] = set()
-    unique_ids: list[str] = []
-    for conv_id in df["conversation_id"].dropna().astype(str):
-        if conv_id not in seen:
-            seen.add(conv_id)
-            unique_ids.append(conv_id)
-
-    return unique_ids
+    # Drop missing values, convert to string, and de-duplicate in pandas' C
+    # hash table; drop_duplicates keeps first occurrence, preserving order.
+    return df["conversation_id"].dropna().astype(str).drop_duplicates().tolist()
 
 
 def parse_args() -> argparse.Namespace:
@@ -74,6 +165,11 @@ def parse_args() -> argparse.Namespace:
         "--conversation-csv",
         help="Path to a CSV file that includes a 'conversation_id' column.",
     )
+    parser.add_argument(
+        "--total",
+        action="store_true",
+        help="Print one total per candidate over the recent window instead of the daily table.",
+    )
     return parser.parse_args()
 
 
@@ -90,26 +186,39 @@ def main():
     if not BEARER_TOKEN:
         raise RuntimeError("X_BEARER_TOKEN is not set in the environment.")
 
+    if args.total:
+        totals: dict[str, int] = {}
+        with ThreadPoolExecutor(max_workers=min(8, len(CANDIDATES))) as executor:
+            futures = {executor.submit(count_recent_tweets, query): name for name, query in CANDIDATES.items()}
+            for future in as_completed(futures):
+                totals[futures[future]] = future.result()
+
+        print("\nTotal tweet counts (recent window):")
+        for name in CANDIDATES:
+            print(f"{name}: {totals[name]}")
+        return
+
     out_dict: dict[str, list[int]] = {}
     index_dates: list[str] | None = None
 
-    for short_name, query in CANDIDATES.items():
-        print(f"Querying counts for: {short_name} ...")
-        data = fetch_counts(query)
-
-        # On the first candidate, build the index (one row per day)
-        if index_dates is None:
-            index_dates = [row["start"][:10] for row in data]  # 'YYYY-MM-DD'
+    # Each query is pure I/O waiting on the API, so fetch all candidates in
+    # parallel; call_api's throttling and backoff handle any rate limiting.
+    with ThreadPoolExecutor(max_workers=min(8, len(CANDIDATES))) as executor:
+        futures = {executor.submit(fetch_counts, query): name for name, query in CANDIDATES.items()}
+        for future in as_completed(futures):
+            short_name = futures[future]
+            data = future.result()
+            print(f"Got counts for: {short_name}")
 
-        # Store tweet_count for each day
-        counts = [row["tweet_count"] for row in data]
-        out_dict[short_name] = counts
+            # Build the index (one row per day) from whichever result lands first
+            if index_dates is None:
+                index_dates = [row["start"][:10] for row in data]  # 'YYYY-MM-DD'
 
-        # Small pause, just to be gentle with the API
-        time.sleep(1)
+            # Store tweet_count for each day
+            out_dict[short_name] = [row["tweet_count"] for row in data]
 
-    # Build DataFrame: rows = days, columns = candidates
-    df = pd.DataFrame(out_dict, index=index_dates)
+    # Build DataFrame: rows = days, columns = candidates (in CANDIDATES order)
+    df = pd.DataFrame({name: out_dict[name] for name in CANDIDATES}, index=index_dates)
     df.index.name = "date"
 
     print("\nDaily tweet counts (recent window):")
@@ -118,7 +227,9 @@ def main():
     # Save to CSV in the current directory
     timestamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
     out_name = f"x_counts_recent_{timestamp}.csv"
-    df.to_csv(out_name)
+    # Arrow's CSV writer formats columnar buffers in C, several times faster
+    # than pandas' writer once the candidate set grows.
+    pacsv.write_csv(pa.Table.from_pandas(df.reset_index()), out_name)
     print(f"\nSaved CSV to {out_name}")
 
 
@@ -8,13 +8,13 @@ Environment:
 """
 
 import argparse
-import json
 import os
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any
 
+import orjson
 import pandas as pd
 import tweepy
 
@@ -22,6 +22,7 @@ BEARER_TOKEN = os.getenv("X_BEARER_TOKEN")
 
 DEFAULT_CSV = Path("data/account_search-allmetrics_honduras.csv")
 DEFAULT_OUTPUT = Path("replies_by_conversation.json")
+DEFAULT_CACHE = Path("replies_cache.parquet")
 
 
 def parse_args() -> argparse.Namespace:
@@ -47,10 +48,16 @@ def parse_args() -> argparse.Namespace:
         help="Path to write the replies JSON file.",
     )
     parser.add_argument(
-        "--sleep-between",
+        "--cache",
+        type=Path,
+        default=DEFAULT_CACHE,
+        help="Parquet file caching replies per conversation across runs.",
+    )
+    parser.add_argument(
+        "--cache-ttl-hours",
         type=float,
-        default=0.8,
-        help="Seconds to sleep between paginator pages to respect rate limits.",
+        default=6.0,
+        help="Reuse cached replies younger than this; 0 forces a refetch.",
     )
     return parser.parse_args()
 
@@ -59,33 +66,66 @@ def load_conversation_ids(csv_path: Path) -> list[str]:
     if not csv_path.exists():
         raise FileNotFoundError(f"CSV not found: {csv_path}")
 
-    df = pd.read_csv(csv_path)
+    try:
+        # Only the conversation_id column is needed; skip parsing the rest.
+        df = pd.read_csv(csv_path, usecols=["conversation_id"], dtype={"conversation_id": "string"})
+    except ValueError:
+        # Fall back to a full read so a missing column still raises KeyError.
+        df = pd.read_csv(csv_path)
     if "conversation_id" not in df.columns:
         raise KeyError("CSV must include a 'conversation_id' column")
 
-    seen: set[str] = set()
-    unique_ids: list[str] = []
-    for value in df["conversation_id"].dropna().astype(str):
-        if value not in seen:
-            seen.add(value)
-            unique_ids.append(value)
-
-    return unique_ids
+    # drop_duplicates keeps first occurrence, so order is preserved while the
+    # dedup itself runs inside pandas rather than a Python loop.
+    return df["conversation_id"].dropna().astype(str).drop_duplicates().tolist()
 
 
 def tweet_to_dict(tweet: tweepy.Tweet) -> dict[str, Any]:
     return tweet.data if hasattr(tweet, "data") else tweet._json  # type: ignore[attr-defined]
 
 
+def load_reply_cache(cache_path: Path) -> dict[str, dict[str, Any]]:
+    """Load the reply cache, mapping conversation_id -> {fetched_at, replies}."""
+    if not cache_path.exists():
+        return {}
+    df = pd.read_parquet(cache_path)
+    return {
+        row.conversation_id: {
+            "fetched_at": datetime.fromisoformat(row.fetched_at),
+            "replies": orjson.loads(row.replies),
+        }
+        for row in df.itertuples()
+    }
+
+
+def save_reply_cache(cache_path: Path, cache: dict[str, dict[str, Any]]) -> None:
+    df = pd.DataFrame(
+        {
+            "conversation_id": list(cache),
+            "fetched_at": [entry["fetched_at"].isoformat() for entry in cache.values()],
+            "replies": [orjson.dumps(entry["replies"]).decode() for entry in cache.values()],
+        }
+    )
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_parquet(cache_path, index=False)
+
+
 def fetch_conversation_replies(
-    client: tweepy.Client, conv_id: str, start_time: datetime, sleep_between: float
-) -> list[tweepy.Tweet]:
+    client: tweepy.Client, conv_id: str, start_time: str
+) -> tuple[str, list[tweepy.Tweet], bool]:
+    """Fetch replies for one conversation.
+
+    Returns ``(conv_id, replies, ok)``; ``ok`` is False when the fetch
+    errored, so callers can keep any partial replies without caching them.
+    """
     replies: list[tweepy.Tweet] = []
     try:
         for response in tweepy.Paginator(
             client.search_recent_tweets,
             query=f"conversation_id:{conv_id}",
             start_time=start_time,
+            # Only tweet payloads are kept (response.includes is never read),
+            # so don't ask the API to expand and ship user objects.
             tweet_fields=[
                 "author_id",
                 "created_at",
@@ -93,19 +133,14 @@ def fetch_conversation_replies(
                 "lang",
                 "in_reply_to_user_id",
             ],
-            expansions=["author_id"],
-            user_fields=["username", "name", "verified"],
             max_results=100,
         ):
             if response.data:
                 replies.extend(response.data)
-            time.sleep(sleep_between)
-    except tweepy.TooManyRequests:
-        print("Rate limit hit – waiting 15 minutes...")
-        time.sleep(15 * 60 + 5)
     except Exception as exc:  # pragma: no cover - defensive logging
         print(f"Error fetching {conv_id}: {exc}")
-    return replies
+        return conv_id, replies, False
+    return conv_id, replies, True
 
 
 def main() -> None:
@@ -121,27 +156,62 @@ def main() -> None:
 
     client = tweepy.Client(bearer_token=BEARER_TOKEN, wait_on_rate_limit=True)
 
-    start_time = datetime.now(timezone.utc) - timedelta(days=args.days_back)
-    all_replies: dict[str, list[tweepy.Tweet]] = {}
+    # Format the window start once; passing the string straight through means
+    # it is not re-serialized for every page of every conversation.
+    start_dt = datetime.now(timezone.utc) - timedelta(days=args.days_back)
+    start_time = start_dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+    all_replies: dict[str, list[dict[str, Any]]] = {}
+
+    # Recent search is idempotent over its window, so reuse cached replies for
+    # conversations fetched within the TTL and hit the network only for the rest.
+    cache = load_reply_cache(args.cache)
+    now = datetime.now(timezone.utc)
+    ttl = timedelta(hours=args.cache_ttl_hours)
 
+    to_fetch: list[str] = []
     for conv_id in conversation_ids:
-        print(f"Fetching replies for conversation {conv_id}...")
-        replies = fetch_conversation_replies(client, conv_id, start_time, args.sleep_between)
-        all_replies[conv_id] = replies
-        print(f"→ Got {len(replies)} replies")
+        entry = cache.get(conv_id)
+        if entry is not None and now - entry["fetched_at"] < ttl:
+            all_replies[conv_id] = entry["replies"]
+            print(f"→ Reusing {len(entry['replies'])} cached replies for conversation {conv_id}")
+        else:
+            to_fetch.append(conv_id)
+
+    # Each conversation is an independent recent-search query, so fan them out
+    # across threads; tweepy.Client is thread-safe for reads and
+    # wait_on_rate_limit handles any 429s.
+    if to_fetch:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [
+                executor.submit(fetch_conversation_replies, client, conv_id, start_time)
+                for conv_id in to_fetch
+            ]
+            for future in as_completed(futures):
+                conv_id, replies, ok = future.result()
+                reply_dicts = [tweet_to_dict(tweet) for tweet in replies]
+                stale = cache.get(conv_id)
+                if stale is not None and len(stale["replies"]) > len(reply_dicts):
+                    # The window slid past older replies (or the fetch errored
+                    # partway); when in doubt keep the larger set.
+                    reply_dicts = stale["replies"]
+                all_replies[conv_id] = reply_dicts
+                if ok:
+                    cache[conv_id] = {"fetched_at": now, "replies": reply_dicts}
+                    print(f"→ Got {len(reply_dicts)} replies for conversation {conv_id}")
+                else:
+                    # Don't persist a failed fetch, or reruns within the TTL
+                    # would silently reuse it instead of retrying.
+                    print(f"→ Fetch failed for conversation {conv_id}; keeping {len(reply_dicts)} replies uncached")
+
+        save_reply_cache(args.cache, cache)
 
     print(f"\nDone! Total conversations processed: {len(conversation_ids)}")
     print(f"Total replies collected: {sum(len(v) for v in all_replies.values())}")
 
     args.output.parent.mkdir(parents=True, exist_ok=True)
-    with args.output.open("w", encoding="utf-8") as f:
-        json.dump(
-            {key: [tweet_to_dict(tweet) for tweet in tweets] for key, tweets in all_replies.items()},
-            f,
-            indent=2,
-            ensure_ascii=False,
-            default=str,
-        )
+    # orjson serializes straight to UTF-8 bytes, so write them as-is with no
+    # text-IO layer in between.
+    args.output.write_bytes(orjson.dumps(all_replies, option=orjson.OPT_INDENT_2, default=str))
     print(f"Saved replies to {args.output}")
 
 